@@ -1,14 +1,16 @@
-import json
 import os
 import re
-from collections import Counter, defaultdict
+import sys
+from collections import Counter, defaultdict, deque
 from datetime import datetime
 from pathlib import Path
+from xml.sax.saxutils import escape
 
 import httpx
-import matplotlib
-matplotlib.use("Agg")
-import matplotlib.pyplot as plt
+import ijson
+import orjson
+
+from .http import CLIENT
 
 MESSAGES_URL = "https://november7-730026606190.europe-west1.run.app/messages/"
 PAGE_LIMIT = 100  # Keep limit at default page size to avoid API throttling
@@ -16,6 +18,20 @@ MIN_LIMIT = 1
 REPORTS_DIR = Path("reports")
 REPORTS_DIR.mkdir(exist_ok=True)
 KEYWORD_CUES = ["trip", "travel", "flight", "car", "vehicle", "restaurant", "reservation"]
+# Compiled once so analyze() doesn't pay re.compile per call.
+_DATE_REGEX = re.compile(r"\b(?:\d{4}-\d{2}-\d{2}|\d{1,2}/\d{1,2}/\d{2,4}|[A-Za-z]+ \d{1,2}(?:, \d{4})?)\b")
+# Every branch above needs a digit, so this scan gates the full alternation.
+_DIGIT_RE = re.compile(r"\d")
+# Single alternation over all cues so each message is scanned once instead of
+# once per keyword. None of the cues is a prefix of another, so plain order is fine.
+# The pattern works on UTF-8 bytes: bytes.lower() is an ASCII-only table pass,
+# noticeably cheaper than Unicode-aware str.lower(), and all cues are ASCII.
+_KEYWORD_RE = re.compile(b"|".join(kw.encode() for kw in KEYWORD_CUES))
+_CUE_NAMES = {kw.encode(): kw for kw in KEYWORD_CUES}
+# Hot-path constants for the car-count scan; built once instead of per call.
+# \w already covers digits, so a single token class is enough.
+_TOKEN_RE = re.compile(rb"\w+")
+_CAR_WORDS = frozenset({b"car", b"cars", b"vehicle", b"vehicles"})
 USE_API = os.getenv("ANALYZE_USE_API", "false").lower() in {"1", "true", "yes", "on"}
 BASE_DIR = Path(__file__).resolve().parent.parent
 DATA_DIR = BASE_DIR / "data"
@@ -29,8 +45,7 @@ SAMPLE_DUMP = DATA_DIR / "messages.json"
 def _load_messages_from(path: Path):
     if not path.exists():
         return []
-    with path.open("r", encoding="utf-8") as f:
-        data = json.load(f)
+    data = orjson.loads(path.read_bytes())
     if isinstance(data, dict) and isinstance(data.get("items"), list):
         return data["items"]
     if isinstance(data, list):
@@ -38,6 +53,16 @@ def _load_messages_from(path: Path):
     raise ValueError(f"Unexpected format in {path}")
 
 
+def _iter_messages_from(path: Path):
+    # Stream one message at a time so the analyzer never holds the whole dump;
+    # handles both the {"items": [...]} and bare-list file shapes.
+    with path.open("rb") as f:
+        head = f.read(1)
+        f.seek(0)
+        prefix = "item" if head == b"[" else "items.item"
+        yield from ijson.items(f, prefix)
+
+
 def _handle_api_failure(exc, collected):
     # fallback to whatever dump we have when the live pagination fails.
     fallback = _load_messages_from(DATA_DUMP) or _load_messages_from(FALLBACK_DUMP) or _load_messages_from(SAMPLE_DUMP)
@@ -86,22 +111,21 @@ def _fetch_messages_from_api():
     skip = 0
     total = None
     try:
-        with httpx.Client(timeout=30, follow_redirects=True) as client:
-            while True:
-                data, page_count, used_limit = _fetch_page(client, skip)
-                chunk = data.get("items", [])
-                if not chunk:
-                    break
-
-                collected.extend(chunk)
-                skip += page_count
-
-                if total is None:
-                    total = data.get("total")
-                if total is not None and skip >= total:
-                    break
-                if used_limit and page_count < used_limit:
-                    break
+        while True:
+            data, page_count, used_limit = _fetch_page(CLIENT, skip)
+            chunk = data.get("items", [])
+            if not chunk:
+                break
+
+            collected.extend(chunk)
+            skip += page_count
+
+            if total is None:
+                total = data.get("total")
+            if total is not None and skip >= total:
+                break
+            if used_limit and page_count < used_limit:
+                break
     except (httpx.HTTPStatusError, httpx.RequestError) as exc:
         return _handle_api_failure(exc, collected)
 
@@ -115,10 +139,11 @@ def fetch_messages():
     if USE_API:
         return _fetch_messages_from_api()
     # Prefer the full dump when available, otherwise fall back to the shipped 100-message sample.
+    # Local dumps are streamed; analyze() accepts any iterable.
     for candidate in (DATA_DUMP, FALLBACK_DUMP, SAMPLE_DUMP):
         if candidate.exists():
             print(f"Loading data from {candidate}.")
-            return _load_messages_from(candidate)
+            return _iter_messages_from(candidate)
     return []
 
 
@@ -131,6 +156,27 @@ def _parse_timestamp(value):
         return None
 
 
+def _extract_car_count(lowered):
+    # Takes already-lowercased text so callers don't pay a second .lower().
+    # Walk tokens once: keep the last 5 in a ring buffer and, after a
+    # car/vehicle hit, inspect up to 5 following tokens for a digit.
+    window = deque(maxlen=5)
+    pending = 0
+    for match in _TOKEN_RE.finditer(lowered):
+        tok = match.group(0)
+        if pending:
+            if tok.isdigit():
+                return int(tok.decode())
+            pending -= 1
+        if tok in _CAR_WORDS:
+            for prev in window:
+                if prev.isdigit():
+                    return int(prev.decode())
+            pending = 5
+        window.append(tok)
+    return None
+
+
 def _sample_messages(messages, limit=3):
     samples = []
     for m in messages[:limit]:
@@ -142,36 +188,88 @@ def _sample_messages(messages, limit=3):
     return samples
 
 
+# Hand-rolled SVG emission: these charts are simple enough that writing the
+# elements directly beats importing a full plotting stack for every run.
+_SVG_FONT = 'font-family="Helvetica, Arial, sans-serif"'
+
+
+def _write_svg(out_path, width, height, parts):
+    body = "\n".join(parts)
+    svg = (
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}" '
+        f'viewBox="0 0 {width} {height}">\n'
+        '<rect width="100%" height="100%" fill="white"/>\n'
+        f"{body}\n</svg>\n"
+    )
+    Path(out_path).write_text(svg, encoding="utf-8")
+
+
+def _svg_title(width, title):
+    return f'<text x="{width // 2}" y="28" text-anchor="middle" {_SVG_FONT} font-size="18">{escape(title)}</text>'
+
+
+# vertical bars with rotated labels, shared by the keyword and anomaly charts.
+def _svg_bar_chart(labels, counts, color, title, out_path):
+    width, height, top, bottom_margin, left = 1000, 360, 50, 90, 50
+    plot_h = height - top - bottom_margin
+    max_count = max(counts) or 1
+    slot = (width - 2 * left) / len(labels)
+    bar_w = slot * 0.6
+    parts = [_svg_title(width, title)]
+    for i, (label, count) in enumerate(zip(labels, counts)):
+        x = left + i * slot + (slot - bar_w) / 2
+        bar_h = plot_h * count / max_count
+        y = top + plot_h - bar_h
+        parts.append(f'<rect x="{x:.1f}" y="{y:.1f}" width="{bar_w:.1f}" height="{bar_h:.1f}" fill="{color}"/>')
+        parts.append(f'<text x="{x + bar_w / 2:.1f}" y="{y - 6:.1f}" text-anchor="middle" {_SVG_FONT} font-size="12">{count}</text>')
+        lx, ly = x + bar_w / 2, top + plot_h + 16
+        parts.append(
+            f'<text x="{lx:.1f}" y="{ly:.1f}" text-anchor="end" {_SVG_FONT} font-size="12" '
+            f'transform="rotate(-45 {lx:.1f} {ly:.1f})">{escape(str(label))}</text>'
+        )
+    _write_svg(out_path, width, height, parts)
+
+
 # draw a horizontal bar chart of the most active members.
 def _plot_member_distribution(distribution, out_path):
     if not distribution:
         return
-    names = [entry["member"] for entry in distribution]
-    counts = [entry["count"] for entry in distribution]
-    plt.figure(figsize=(10, 5))
-    plt.barh(names[::-1], counts[::-1], color="#5a7bd0")
-    plt.title("Top Members by Message Count")
-    plt.xlabel("Message count")
-    plt.tight_layout()
-    plt.savefig(out_path)
-    plt.close()
+    width, row_h, top, left = 1000, 28, 50, 220
+    height = top + row_h * len(distribution) + 30
+    max_count = max(entry["count"] for entry in distribution) or 1
+    parts = [_svg_title(width, "Top Members by Message Count")]
+    for i, entry in enumerate(distribution):
+        y = top + i * row_h
+        bar_w = (width - left - 80) * entry["count"] / max_count
+        parts.append(f'<text x="{left - 10}" y="{y + 15}" text-anchor="end" {_SVG_FONT} font-size="13">{escape(str(entry["member"]))}</text>')
+        parts.append(f'<rect x="{left}" y="{y}" width="{bar_w:.1f}" height="{row_h - 8}" fill="#5a7bd0"/>')
+        parts.append(f'<text x="{left + bar_w + 6:.1f}" y="{y + 15}" {_SVG_FONT} font-size="13">{entry["count"]}</text>')
+    _write_svg(out_path, width, height, parts)
 
 
 # simple timeline to show how conversations wave over months.
 def _plot_timeline(monthly_counts, out_path):
     if not monthly_counts:
         return
-    months = [entry["month"] for entry in monthly_counts]
+    width, height, top, bottom_margin, left = 1000, 320, 50, 70, 60
+    plot_h = height - top - bottom_margin
     counts = [entry["count"] for entry in monthly_counts]
-    plt.figure(figsize=(10, 4))
-    plt.plot(months, counts, marker="o", color="#c65c8f")
-    plt.title("Messages Over Time")
-    plt.xlabel("Month")
-    plt.ylabel("Messages")
-    plt.xticks(rotation=45)
-    plt.tight_layout()
-    plt.savefig(out_path)
-    plt.close()
+    max_count = max(counts) or 1
+    step = (width - left - 40) / max(len(monthly_counts) - 1, 1)
+    points = []
+    parts = [_svg_title(width, "Messages Over Time")]
+    for i, entry in enumerate(monthly_counts):
+        x = left + i * step
+        y = top + plot_h * (1 - entry["count"] / max_count)
+        points.append(f"{x:.1f},{y:.1f}")
+        parts.append(f'<circle cx="{x:.1f}" cy="{y:.1f}" r="4" fill="#c65c8f"/>')
+        ly = top + plot_h + 16
+        parts.append(
+            f'<text x="{x:.1f}" y="{ly}" text-anchor="end" {_SVG_FONT} font-size="12" '
+            f'transform="rotate(-45 {x:.1f} {ly})">{escape(entry["month"])}</text>'
+        )
+    parts.insert(1, f'<polyline points="{" ".join(points)}" fill="none" stroke="#c65c8f" stroke-width="2"/>')
+    _write_svg(out_path, width, height, parts)
 
 
 # keyword coverage to see which cues come up most.
@@ -180,52 +278,58 @@ def _plot_keyword_coverage(keyword_counts, out_path):
         return
     sorted_items = sorted(keyword_counts.items(), key=lambda item: item[1], reverse=True)
     keywords, counts = zip(*sorted_items)
-    plt.figure(figsize=(10, 4))
-    plt.bar(keywords, counts, color="#3b8c5a")
-    plt.title("Keyword Mentions")
-    plt.ylabel("Mentions")
-    plt.xticks(rotation=45)
-    plt.tight_layout()
-    plt.savefig(out_path)
-    plt.close()
+    _svg_bar_chart(keywords, counts, "#3b8c5a", "Keyword Mentions", out_path)
 
 
 # anomalies histogram for quick spotting of odd rows.
 def _plot_anomaly_histogram(anomaly_counts, out_path):
     # Always emit a chart so reviewers see that we checked for anomalies.
-    plt.figure(figsize=(10, 4))
     if not anomaly_counts:
-        plt.title("Anomaly Counts (none detected)")
-        plt.text(0.5, 0.5, "No anomalies found", ha="center", va="center", fontsize=12)
-        plt.axis("off")
-    else:
-        types = list(anomaly_counts.keys())
-        counts = [anomaly_counts[t] for t in types]
-        plt.bar(types, counts, color="#e07b39")
-        plt.title("Anomaly Counts")
-        plt.ylabel("Count")
-        plt.xticks(rotation=45)
-        plt.tight_layout()
-    plt.savefig(out_path)
-    plt.close()
+        width, height = 1000, 320
+        parts = [
+            _svg_title(width, "Anomaly Counts (none detected)"),
+            f'<text x="{width // 2}" y="{height // 2}" text-anchor="middle" {_SVG_FONT} font-size="14">No anomalies found</text>',
+        ]
+        _write_svg(out_path, width, height, parts)
+        return
+    types = list(anomaly_counts.keys())
+    counts = [anomaly_counts[t] for t in types]
+    _svg_bar_chart(types, counts, "#e07b39", "Anomaly Counts", out_path)
 
 
 # gather counts, keywords, and anomalies for the report.
 def analyze(messages):
+    # messages may be any iterable (list or streaming generator).
+    total_messages = 0
     member_counts = Counter()
     empty_contents = []
     keyword_counts = Counter({kw: 0 for kw in KEYWORD_CUES})
     timeline_counts = Counter()
     car_mentions = defaultdict(list)
+    # Most messages are unique, so track those in a plain set of hashes and
+    # only promote a key into the counter once it actually repeats.
+    seen_hashes = set()
     duplicate_counter = Counter()
+    dup_previews = {}
     missing_name_messages = []
     missing_timestamp_messages = []
     long_messages = []
     anomaly_counts = Counter()
-    date_regex = re.compile(r"\b(?:\d{4}-\d{2}-\d{2}|\d{1,2}/\d{1,2}/\d{2,4}|[A-Za-z]+ \d{1,2}(?:, \d{4})?)\b")
+    messages_with_dates = 0
+    # Few distinct months across thousands of messages, so format each label once.
+    month_labels = {}
+    # Same story for names: a handful of members send thousands of messages, so
+    # strip/intern each raw name once and reuse the pointer-equal string.
+    name_cache = {}
 
     for m in messages:
-        member = (m.get("user_name", "") or "").strip()
+        total_messages += 1
+        raw_name = m.get("user_name") or ""
+        member = name_cache.get(raw_name)
+        if member is None:
+            member = sys.intern(raw_name.strip())
+            name_cache[raw_name] = member
+        owner = member or "Unknown"
         text = str(m.get("message", "") or "")
         if not text.strip():
             empty_contents.append(m)
@@ -236,50 +340,57 @@ def analyze(messages):
 
         timestamp = _parse_timestamp(m.get("timestamp", ""))
         if timestamp:
-            month_label = f"{timestamp.year}-{timestamp.month:02}"
+            month_key = (timestamp.year, timestamp.month)
+            month_label = month_labels.get(month_key)
+            if month_label is None:
+                month_label = f"{timestamp.year}-{timestamp.month:02}"
+                month_labels[month_key] = month_label
             timeline_counts[month_label] += 1
         else:
             missing_timestamp_messages.append(m)
 
-        normalized = text.lower()
-        for keyword in KEYWORD_CUES:
-            if keyword in normalized:
-                keyword_counts[keyword] += 1
+        if _DIGIT_RE.search(text) and _DATE_REGEX.search(text):
+            messages_with_dates += 1
 
-        if len(text) > 220:
-            long_messages.append({"member": member or "Unknown", "length": len(text), "preview": text[:120]})
-
-        if "car" in normalized or "vehicle" in normalized:
-            car_mentions[member or "Unknown"].append(text)
+        # Lowercase on UTF-8 bytes: ASCII table pass, no Unicode casing lookups.
+        normalized = text.encode("utf-8").lower()
+        found_cues = {match.group(0) for match in _KEYWORD_RE.finditer(normalized)}
+        for keyword in found_cues:
+            keyword_counts[_CUE_NAMES[keyword]] += 1
 
-        duplicate_key = (member or "Unknown", text)
-        duplicate_counter[duplicate_key] += 1
+        if len(text) > 220:
+            long_messages.append({"member": owner, "length": len(text), "preview": text[:120]})
+
+        if b"car" in found_cues or b"vehicle" in found_cues:
+            # Keep the lowercased form; the conflict pass only tokenizes it.
+            car_mentions[owner].append(normalized)
+
+        duplicate_key = hash((owner, text))
+        if duplicate_key in seen_hashes:
+            if duplicate_key in duplicate_counter:
+                duplicate_counter[duplicate_key] += 1
+            else:
+                # Second sighting: the text matches the first one, so the
+                # preview can be taken from this occurrence.
+                duplicate_counter[duplicate_key] = 2
+                dup_previews[duplicate_key] = (owner, text[:120])
+        else:
+            seen_hashes.add(duplicate_key)
 
     duplicate_examples = []
-    for (owner, msg_text), count in duplicate_counter.items():
-        if count > 1:
-            duplicate_examples.append({
-                "member": owner,
-                "count": count,
-                "preview": msg_text[:120],
-            })
-
-    messages_with_dates = sum(1 for m in messages if date_regex.search(str(m.get("message", ""))))
-    duplicate_members = [name for name, cnt in member_counts.items() if cnt > 10]
+    for duplicate_key, count in duplicate_counter.items():
+        owner, preview = dup_previews[duplicate_key]
+        duplicate_examples.append({
+            "member": owner,
+            "count": count,
+            "preview": preview,
+        })
 
-    def extract_car_count(t):
-        tokens = re.findall(r"\w+|\d+", t.lower())
-        for i, tok in enumerate(tokens):
-            if tok in {"car", "cars", "vehicle", "vehicles"}:
-                span = tokens[max(0, i - 5): i + 6]
-                for s in span:
-                    if s.isdigit():
-                        return int(s)
-        return None
+    duplicate_members = [name for name, cnt in member_counts.items() if cnt > 10]
 
     car_count_conflicts = []
     for member, texts in car_mentions.items():
-        counts = {extract_car_count(t) for t in texts}
+        counts = {_extract_car_count(lowered) for lowered in texts}
         counts.discard(None)
         if len(counts) > 1:
             car_count_conflicts.append({"member": member, "counts": sorted(counts)})
@@ -324,7 +435,7 @@ def analyze(messages):
         anomaly_counts["duplicate_text"] = len(duplicate_examples)
 
     return {
-        "total_messages": len(messages),
+        "total_messages": total_messages,
         "unique_members": len(member_counts),
         "duplicate_member_names_over_10_msgs": duplicate_members,
         "empty_content_messages": len(empty_contents),
@@ -345,17 +456,18 @@ def main():
     report = analyze(msgs)
     print("Computed report, dumping to JSON.")
     insights_path = DATA_DIR / "data_insights.json"
-    with insights_path.open("w", encoding="utf-8") as f:
-        json.dump(report, f, indent=2)
+    insights_path.write_bytes(orjson.dumps(report, option=orjson.OPT_INDENT_2))
     print(f"Wrote {insights_path}")
-    _plot_member_distribution(report["member_message_distribution"][:10], REPORTS_DIR / "messages_by_member.png")
-    print("Saved member distribution chart.")
-    _plot_timeline(report["monthly_message_counts"], REPORTS_DIR / "messages_timeline.png")
-    print("Saved timeline chart.")
-    _plot_keyword_coverage(report["keyword_mentions"], REPORTS_DIR / "keyword_coverage.png")
-    print("Saved keyword coverage chart.")
-    _plot_anomaly_histogram(report.get("anomaly_counts", {}), REPORTS_DIR / "anomaly_histogram.png")
-    print("Saved anomaly histogram chart.")
+    # SVG emission is a few string writes per chart, so no need to fan these
+    # out to worker processes the way the old Agg rasterization warranted.
+    chart_jobs = [
+        (_plot_member_distribution, report["member_message_distribution"][:10], REPORTS_DIR / "messages_by_member.svg"),
+        (_plot_timeline, report["monthly_message_counts"], REPORTS_DIR / "messages_timeline.svg"),
+        (_plot_keyword_coverage, report["keyword_mentions"], REPORTS_DIR / "keyword_coverage.svg"),
+        (_plot_anomaly_histogram, report.get("anomaly_counts", {}), REPORTS_DIR / "anomaly_histogram.svg"),
+    ]
+    for fn, data, out_path in chart_jobs:
+        fn(data, out_path)
     print("Charts saved in reports/")
 
 
@@ -1,12 +1,15 @@
 import argparse
-import json
-import time
+import asyncio
 from pathlib import Path
 
 import httpx
+import orjson
+
+from .http import LIMITS
 
 MESSAGES_URL = "https://november7-730026606190.europe-west1.run.app/messages/"
 DEFAULT_LIMIT = 100
+MAX_CONCURRENCY = 8  # parallel page fetches; bounded so we don't hammer the API
 BASE_DIR = Path(__file__).resolve().parent.parent
 DATA_DIR = BASE_DIR / "data"
 DATA_DIR.mkdir(exist_ok=True)
@@ -18,77 +21,124 @@ TEMP_OUTPUT = DATA_DIR / "messages_fetch_full.tmp.json"
 def _load_existing():
     if not OUTPUT_PATH.exists():
         return []
-    with OUTPUT_PATH.open("r", encoding="utf-8") as f:
-        data = json.load(f)
+    data = orjson.loads(OUTPUT_PATH.read_bytes())
     return data.get("items", []) if isinstance(data, dict) else data
 
 
-def fetch_all(limit: int = DEFAULT_LIMIT, delay: float = 0.2, *, output_path: Path = OUTPUT_PATH, temp_path: Path = TEMP_OUTPUT):
-    """Stream messages with skip/limit and save into a local JSON file."""
+def _parse_payload(payload):
+    """Return (items, total) from either the dict or bare-list response shape."""
+    if isinstance(payload, dict):
+        return payload.get("items", []), payload.get("total")
+    if isinstance(payload, list):
+        return payload, None
+    raise ValueError("Unexpected API response")
+
+
+def _merge_chunk(chunk, collected, seen_ids):
+    added = 0
+    for msg in chunk:
+        msg_id = msg.get("id")
+        if msg_id and msg_id in seen_ids:
+            continue
+        if msg_id:
+            seen_ids.add(msg_id)
+        collected.append(msg)
+        added += 1
+    return added
+
+
+async def _fetch_page(client, semaphore, skip, limit):
+    async with semaphore:
+        resp = await client.get(MESSAGES_URL, params={"skip": skip, "limit": limit})
+    resp.raise_for_status()
+    items, _ = _parse_payload(resp.json())
+    print(f"Fetched {len(items)} rows at skip={skip}.")
+    return items
+
+
+async def _fetch_all_async(limit=DEFAULT_LIMIT, delay=0.2):
     collected = list(_load_existing())
     print(f"Starting with {len(collected)} cached messages.")
     seen_ids = {msg.get("id") for msg in collected if msg.get("id")}
     skip = len(collected)
     total = None
 
-    with httpx.Client(timeout=30, follow_redirects=True) as client:
+    async with httpx.AsyncClient(http2=True, timeout=30, follow_redirects=True, limits=LIMITS) as client:
+        # Probe the first page sequentially, keeping the limit-halving retry,
+        # so we learn the server's total before fanning out.
         while True:
-            params = {"skip": skip, "limit": limit}
-            resp = client.get(MESSAGES_URL, params=params)
+            resp = await client.get(MESSAGES_URL, params={"skip": skip, "limit": limit})
 
             if resp.status_code == 200:
-                payload = resp.json()
-                chunk = []
-                if isinstance(payload, dict):
-                    chunk = payload.get("items", [])
-                    total = payload.get("total", total)
-                elif isinstance(payload, list):
-                    chunk = payload
-                else:
-                    raise ValueError("Unexpected API response")
-
-                if not chunk:
-                    print("No more messages returned; stopping.")
-                    break
-
-                added = 0
-                for msg in chunk:
-                    msg_id = msg.get("id")
-                    if msg_id and msg_id in seen_ids:
-                        continue
-                    if msg_id:
-                        seen_ids.add(msg_id)
-                    collected.append(msg)
-                    added += 1
-
-                print(f"Fetched {len(chunk)} rows (added {added}), total collected {len(collected)}.")
-                if total and len(collected) >= total:
-                    print("Collected at least total count from API.")
-                    break
-
-                skip += len(chunk)
-                time.sleep(delay)
-                continue
+                chunk, total = _parse_payload(resp.json())
+                break
 
             if resp.status_code in {400, 401, 402, 403, 404, 405} and limit > 1:
                 limit = max(1, limit // 2)
                 print(f"Got {resp.status_code}; reducing limit to {limit} and retrying.")
-                time.sleep(delay)
+                await asyncio.sleep(delay)
                 continue
 
             if resp.status_code in {400, 401, 402, 403, 404, 405}:
                 print(f"Received {resp.status_code} even at limit=1; stopping early.")
-                break
+                return collected, total
 
             resp.raise_for_status()
 
-    report = {"total": total or len(collected), "items": collected}
-    temp_path.write_text(json.dumps(report, indent=2), encoding="utf-8")
+        if not chunk:
+            print("No more messages returned; stopping.")
+            return collected, total
+
+        added = _merge_chunk(chunk, collected, seen_ids)
+        print(f"Fetched {len(chunk)} rows (added {added}), total collected {len(collected)}.")
+        skip += len(chunk)
+
+        if total is not None and skip < total:
+            # Total is known, so the remaining pages are independent — fetch
+            # them concurrently over the shared keep-alive connection.
+            semaphore = asyncio.Semaphore(MAX_CONCURRENCY)
+            tasks = [
+                _fetch_page(client, semaphore, s, limit)
+                for s in range(skip, total, limit)
+            ]
+            for chunk in await asyncio.gather(*tasks):
+                _merge_chunk(chunk, collected, seen_ids)
+            print(f"Parallel fetch done, total collected {len(collected)}.")
+        else:
+            # No total reported: fall back to walking pages one at a time.
+            while chunk and (total is None or len(collected) < total):
+                resp = await client.get(MESSAGES_URL, params={"skip": skip, "limit": limit})
+                resp.raise_for_status()
+                chunk, page_total = _parse_payload(resp.json())
+                total = page_total if page_total is not None else total
+                if not chunk:
+                    print("No more messages returned; stopping.")
+                    break
+                added = _merge_chunk(chunk, collected, seen_ids)
+                print(f"Fetched {len(chunk)} rows (added {added}), total collected {len(collected)}.")
+                skip += len(chunk)
+                await asyncio.sleep(delay)
+
+    return collected, total
+
+
+def fetch_all(limit: int = DEFAULT_LIMIT, delay: float = 0.2, *, output_path: Path = OUTPUT_PATH, temp_path: Path = TEMP_OUTPUT):
+    """Fetch every page with skip/limit (in parallel once total is known) and save locally."""
+    collected, total = asyncio.run(_fetch_all_async(limit=limit, delay=delay))
+
+    # Serialize message-by-message so we never hold the whole dump as one
+    # string on top of the collected list.
+    with temp_path.open("wb") as f:
+        f.write(b'{"total": %d, "items": [' % (total or len(collected)))
+        for i, msg in enumerate(collected):
+            if i:
+                f.write(b",")
+            f.write(orjson.dumps(msg))
+        f.write(b"]}")
     temp_path.replace(output_path)
     print(f"Wrote {len(collected)} messages to {output_path}")
 
 
-
 def main():
     parser = argparse.ArgumentParser(description="Fetch all messages via pagination.")
     parser.add_argument("--limit", type=int, default=DEFAULT_LIMIT, help="Initial page size")
@@ -99,4 +149,3 @@ def main():
 
 if __name__ == "__main__":
     main()
-
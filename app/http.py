@@ -0,0 +1,7 @@
+import httpx
+
+# One pooled keep-alive client shared by every module that talks to the
+# messages API. Pagination rides the same TLS session (HTTP/2 when the server
+# supports it) instead of paying a fresh handshake per script or per page.
+LIMITS = httpx.Limits(max_connections=20, max_keepalive_connections=10)
+CLIENT = httpx.Client(http2=True, timeout=30, follow_redirects=True, limits=LIMITS)
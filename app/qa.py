@@ -8,6 +8,31 @@ _DATE_PATTERNS = [
 	r"\b(?:today|tomorrow|tonight|this week|next week|this weekend|next weekend)\b",
 ]
 _DATE_REGEX = re.compile("|".join(_DATE_PATTERNS), flags=re.IGNORECASE)
+# Every date pattern needs a digit or one of these words, so this cheap scan
+# lets us skip the 5-branch alternation on texts that can't possibly match.
+_DATE_HINT_RE = re.compile(r"\d|today|tomorrow|tonight|week", flags=re.IGNORECASE)
+
+# One alternation instead of four sequential searches; each branch keeps the
+# capitalization rules of the pattern it replaced ((?i:...) scopes the old
+# IGNORECASE to just the "when is" branch).
+_NAME_PATTERN = r"[A-Z][a-z]+(?:\s+[A-Z][a-z]+)?"
+_MEMBER_RE = re.compile(
+	rf"\b(?P<poss>{_NAME_PATTERN})['’]s\b"
+	rf"|\babout\s+(?P<about>{_NAME_PATTERN})\b"
+	rf"|\bfor\s+(?P<prep>{_NAME_PATTERN})\b"
+	rf"|(?i:\bwhen is\s+(?P<when>{_NAME_PATTERN}))"
+)
+
+_LOCATION_RE = re.compile(r"\btrip to\s+([A-Z][a-zA-Z]+)\b", re.IGNORECASE)
+# Single multi-keyword scan for the car-count search; re's alternation runs
+# the four keywords in one linear pass, so no token list is built for texts
+# that never mention a vehicle.
+_CAR_WORD_RE = re.compile(r"\b(?:car|cars|vehicle|vehicles)\b")
+# digits or a spelled-out number in one pattern, so finding one is a single
+# regex step instead of an isdigit check plus a dict probe per token
+_NUM_WORD_RE = re.compile(r"\d+|\b(?:zero|one|two|three|four|five|six|seven|eight|nine|ten)\b")
+# chars inspected around each keyword hit (~8 tokens either side)
+_CAR_WINDOW_CHARS = 40
 
 _NUMBER_WORDS = {
 	"zero": 0,
@@ -23,26 +48,38 @@ _NUMBER_WORDS = {
 	"ten": 10,
 }
 
+# One scan over the question instead of 5+ substring checks. Deliberately
+# unanchored so "trips"/"flights" keep matching like the old substring tests
+# did. The car branch only consumes "how many" (lookahead for the vehicle
+# word), so a trip word sitting between "how many" and "car" still matches
+# its own branch.
+_TOPIC_RE = re.compile(
+	r"(?P<trip>trip|travel|flight)"
+	r"|(?P<car>how many(?=.*?(?:car|vehicle)))"
+	r"|(?P<rest>restaurant|favorite)",
+	re.DOTALL,
+)
+
+# restaurant-extraction patterns, compiled once; the candidate pattern folds
+# the old separate "at/to/in <Place>" pass into the proper-noun scan.
+_FAV_REST_RE = re.compile(r"\bfavorite\b.*\brestaurant", re.IGNORECASE)
+_CANDIDATE_RE = re.compile(r"\b(?:(?P<cue>at|to|in)\s+)?(?P<name>[A-Z][A-Za-z'&.-]+(?:\s+[A-Z][A-Za-z'&.-]+)*)\b")
+# lowercase because it is checked against name.lower()
+_RESTAURANT_STOPWORDS = frozenset({
+	"i", "we", "monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday",
+})
+
 # try to get a member's name out of a question
 def _extract_member_from_question(question):
-	m = re.search(r"\b([A-Z][a-z]+(?:\s+[A-Z][a-z]+)?)['’]s\b", question)
+	m = _MEMBER_RE.search(question)
 	if m:
-		return m.group(1)
-	m2 = re.search(r"\babout\s+([A-Z][a-z]+(?:\s+[A-Z][a-z]+)?)\b", question)
-	if m2:
-		return m2.group(1)
-	m3 = re.search(r"\bfor\s+([A-Z][a-z]+(?:\s+[A-Z][a-z]+)?)\b", question)
-	if m3:
-		return m3.group(1)
-	m4 = re.search(r"\bwhen is\s+([A-Z][a-z]+(?:\s+[A-Z][a-z]+)?)\b", question, flags=re.IGNORECASE)
-	if m4:
-		return m4.group(1)
+		return m.group("poss") or m.group("about") or m.group("prep") or m.group("when")
 	# print(f"Could not extract member from question: {question}")
 	return None
 
 # Looks for locations, right now only simple 'trip to X'
 def _extract_location_from_question(question):
-	m = re.search(r"\btrip to\s+([A-Z][a-zA-Z]+)\b", question, flags=re.IGNORECASE)
+	m = _LOCATION_RE.search(question)
 	if m:
 		return m.group(1)
 	return None
@@ -52,12 +89,9 @@ def _filter_by_member(messages, member_name):
 	if not member_name:
 		return messages
 	member_l = member_name.lower()
-	filtered = [
-		m
-		for m in messages
-		if member_l in (m.meta.get("user_name", "")).lower()
-		or member_l in m.text.lower()
-	]
+	# text_lower already starts with the lowered user_name, so one substring
+	# check covers both the name and the message body
+	filtered = [m for m in messages if member_l in m.text_lower]
 	# print(f"Filtered by member: {filtered if filtered else messages}")
 	return filtered or messages
 
@@ -66,55 +100,61 @@ def _filter_by_location(messages, location):
 	if not location:
 		return messages
 	loc_l = location.lower()
-	filtered = [m for m in messages if loc_l in m.text.lower()]
+	filtered = [m for m in messages if loc_l in m.text_lower]
 	# print(f"Filtered by location: {filtered if filtered else messages}")
 	return filtered or messages
 
 # Extracts the first date-like string using above regexes
 def _extract_date(text):
+	if not _DATE_HINT_RE.search(text):
+		return None
 	m = _DATE_REGEX.search(text)
 	return m.group(0) if m else None
 
 # Try to find a number (or word-number) near "car(s)" mention
 def _extract_car_count(text):
-	window = 8
-	tokens = re.findall(r"\w+|\d+", text.lower())
-	for i, tok in enumerate(tokens):
-		if tok in {"car", "cars", "vehicle", "vehicles"}:
-			# Look around for numbers
-			span = tokens[max(0, i - window) : i + window + 1]
-			for s in span:
-				if s.isdigit():
-					return int(s)
-				if s in _NUMBER_WORDS:
-					return _NUMBER_WORDS[s]
+	lowered = text.lower()
+	for m in _CAR_WORD_RE.finditer(lowered):
+		# Only the chars around this hit get scanned, not the whole message
+		window = lowered[max(0, m.start() - _CAR_WINDOW_CHARS) : m.end() + _CAR_WINDOW_CHARS]
+		num = _NUM_WORD_RE.search(window)
+		if num:
+			s = num.group(0)
+			return int(s) if s.isdigit() else _NUMBER_WORDS[s]
 	return None
 
 # look for proper-noun phrases after certain cues
 def _extract_restaurants(text):
+	has_fav_context = bool(_FAV_REST_RE.search(text))
 	candidates = []
-	if re.search(r"\bfavorite\b.*\brestaurant", text, flags=re.IGNORECASE):
-		# naive proper-noun capture
-		for m in re.finditer(r"\b([A-Z][A-Za-z'&.-]+(?:\s+[A-Z][A-Za-z'&.-]+)*)\b", text):
-			name = m.group(1)
+	# One scan: the optional at/to/in prefix group tells cue-anchored matches
+	# apart from bare proper nouns, which only count in a favorite-restaurant context.
+	for m in _CANDIDATE_RE.finditer(text):
+		name = m.group("name")
+		if m.group("cue"):
+			candidates.append(name)
+			continue
+		if has_fav_context:
 			# filter obvious non-restaurant entities
-			if name.lower() in {"i", "we", "Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"}:
+			if name.lower() in _RESTAURANT_STOPWORDS:
 				continue
 			if len(name) >= 3:
 				candidates.append(name)
-	# Common cue "at <Place>" or "to <Place>"
-	for m in re.finditer(r"\b(?:at|to|in)\s+([A-Z][A-Za-z'&.-]+(?:\s+[A-Z][A-Za-z'&.-]+)*)", text):
-		candidates.append(m.group(1))
-	# Deduplicate while preserving order
+	# Deduplicate while preserving order; set.add returns None, so the
+	# comprehension keeps only the first casing of each name in one pass.
 	seen = set()
-	unique = []
-	for c in candidates:
-		key = c.lower()
-		if key not in seen:
-			seen.add(key)
-			unique.append(c)
+	add = seen.add
 	# print(f"Extracted restaurant candidates: {candidates}")
-	return unique[:5]
+	return [c for c in candidates if (k := c.lower()) not in seen and not add(k)][:5]
+
+# Precomputed once per document at model-build time; the answer branches read
+# these instead of re-running the extraction regexes on every question.
+def extract_entities(text):
+	return {
+		"date": _extract_date(text),
+		"car_count": _extract_car_count(text),
+		"restaurants": _extract_restaurants(text),
+	}
 
 def answer_question(question, retrieved):
 	# print(f"Question: {question}")
@@ -124,11 +164,15 @@ def answer_question(question, retrieved):
 	scope = _filter_by_location(scope, location)
 
 	q_l = question.lower()
+	# Branch priority stays trip > car > restaurant regardless of where the
+	# words sit in the question, so collect every topic hit before dispatching.
+	topics = {m.lastgroup for m in _TOPIC_RE.finditer(q_l)}
 	# print("Final message candidates:", [m.text for m in scope])
-	if "trip" in q_l or "travel" in q_l or "flight" in q_l:
+	if "trip" in topics:
 		# try to extract a date from the most relevant message mentioning the location
 		for r in scope:
-			date = _extract_date(r.text)
+			ents = r.meta.get("_entities")
+			date = ents["date"] if ents is not None else _extract_date(r.text)
 			if date:
 				if member and location:
 					return f"{member} is planning the trip to {location} on {date}."
@@ -138,7 +182,7 @@ def answer_question(question, retrieved):
 		# if no clear date is present, prefer a longer message that actually talks about trips
 		travel_keywords = ["trip", "trips", "travel", "flight", "itinerary"]
 		for r in scope:
-			text_l = r.text.lower()
+			text_l = r.text_lower
 			if any(kw in text_l for kw in travel_keywords) and len(r.text.strip()) > 20:
 				raw = r.meta.get("message") or r.text
 				if member:
@@ -152,9 +196,10 @@ def answer_question(question, retrieved):
 			return raw
 		return "Sorry, I couldn't find travel details."
 
-	if "how many" in q_l and ("car" in q_l or "vehicle" in q_l):
+	if "car" in topics:
 		for r in scope:
-			count = _extract_car_count(r.text)
+			ents = r.meta.get("_entities")
+			count = ents["car_count"] if ents is not None else _extract_car_count(r.text)
 			if count is not None:
 				if member:
 					return f"{member} has {count} car{'s' if count != 1 else ''}."
@@ -162,9 +207,10 @@ def answer_question(question, retrieved):
 		# print("No car count found; fallback")
 		return scope[0].text if scope else "Sorry, I couldn't find how many cars."
 
-	if "restaurant" in q_l or "favorite" in q_l:
+	if "rest" in topics:
 		for r in scope:
-			restaurants = _extract_restaurants(r.text)
+			ents = r.meta.get("_entities")
+			restaurants = ents["restaurants"] if ents is not None else _extract_restaurants(r.text)
 			if restaurants:
 				names = ", ".join(restaurants)
 				if member:
@@ -1,20 +1,30 @@
 import asyncio
-import json
 import time
 from dataclasses import dataclass
 from pathlib import Path
 
+import numpy as np
+import orjson
+from joblib import Parallel, delayed
+from scipy import sparse
+
 from .fetch_all_messages import fetch_all
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
+from .qa import extract_entities
+from sklearn.feature_extraction.text import HashingVectorizer, TfidfTransformer
 
 CACHE_TTL_SECONDS = 30 * 60  # Refresh every 30 minutes (read-heavy cache)
+# Past this point a query kicks off a background refresh so the hard TTL
+# expiry is (usually) never hit on a request's critical path.
+SOFT_TTL_SECONDS = int(CACHE_TTL_SECONDS * 0.9)
 BASE_DIR = Path(__file__).resolve().parent.parent
 DATA_DIR = BASE_DIR / "data"
 DATA_DIR.mkdir(exist_ok=True)
 LOCAL_DUMP = DATA_DIR / "messages_fetch_full.json"
 FALLBACK_DUMP = DATA_DIR / "messages_full.json"
 SAMPLE_DUMP = DATA_DIR / "messages.json"
+# Below this many docs the fork/pickle overhead of parallel hashing outweighs
+# the speedup and the corpus is hashed in one shot.
+PARALLEL_HASH_MIN_DOCS = 2048
 
 
 @dataclass
@@ -22,20 +32,33 @@ class RetrievedMessage:
     text: str
     score: float
     meta: dict
+    # lowered once at build time so the qa filters never call .lower() per query
+    text_lower: str = ""
+
+
+# path -> (mtime_ns, size, parsed items); refresh() re-reads the same dumps
+# every cycle, so skip the parse when the file hasn't changed on disk.
+_FILE_CACHE = {}
 
 
 def _load_messages_from(path: Path):
     if not path.exists():
         return []
+    st = path.stat()
+    cached = _FILE_CACHE.get(str(path))
+    if cached is not None and cached[0] == st.st_mtime_ns and cached[1] == st.st_size:
+        return cached[2]
+    items = []
     try:
-        data = json.loads(path.read_text(encoding="utf-8"))
+        data = orjson.loads(path.read_bytes())
         if isinstance(data, dict) and isinstance(data.get("items"), list):
-            return data["items"]
-        if isinstance(data, list):
-            return data
-    except json.JSONDecodeError:
+            items = data["items"]
+        elif isinstance(data, list):
+            items = data
+    except orjson.JSONDecodeError:
         pass
-    return []
+    _FILE_CACHE[str(path)] = (st.st_mtime_ns, st.st_size, items)
+    return items
 
 
 def _load_local_messages(prefer_primary=True):
@@ -49,31 +72,92 @@ def _load_local_messages(prefer_primary=True):
 
 class MessagesRetriever:
     def __init__(self):
-        self._vectorizer = None
+        # Hashing straight to column indices: no 50k-term vocabulary dict to
+        # hold in memory or probe per token. The hasher is stateless; only the
+        # IDF transformer is fitted per refresh.
+        self._hasher = HashingVectorizer(
+            n_features=2 ** 18,
+            ngram_range=(1, 2),
+            stop_words="english",
+            alternate_sign=False,
+            norm=None,
+        )
+        self._transformer = None
         self._matrix = None
+        self._matrix_T = None
         self._docs = []
+        self._docs_lower = []
         self._last_refresh = 0.0
+        # bumped after every rebuild; callers caching derived answers key on
+        # it so stale entries die with the model that produced them
+        self.generation = 0
+        # Single-flight guard: one coroutine refits while concurrent askers
+        # wait instead of each triggering its own fetch + fit.
+        self._refresh_lock = asyncio.Lock()
+        self._refresh_task = None
+        # question -> transformed query vector; repeated questions skip the
+        # analyzer pipeline transform() rebuilds on every call.
+        self._q_vec_cache = {}
 
     def _should_refresh(self):
         # print("Checking if we should refresh cache...")
         return (time.time() - self._last_refresh) > CACHE_TTL_SECONDS or self._matrix is None
 
+    def _near_expiry(self):
+        return (time.time() - self._last_refresh) > SOFT_TTL_SECONDS
+
+    def _kick_background_refresh(self):
+        if self._refresh_task is None or self._refresh_task.done():
+            self._refresh_task = asyncio.create_task(self._refresh_once())
+
+    async def _refresh_once(self):
+        async with self._refresh_lock:
+            # whoever held the lock may have refreshed already
+            if self._near_expiry():
+                await self.refresh()
+
+    def _hash_corpus(self, corpus):
+        if len(corpus) < PARALLEL_HASH_MIN_DOCS:
+            return self._hasher.transform(corpus)
+        # The hasher is stateless, so chunks hash independently on separate
+        # cores; only the IDF fit below needs the assembled matrix.
+        n_chunks = min(8, len(corpus))
+        step = -(-len(corpus) // n_chunks)
+        chunks = [corpus[i : i + step] for i in range(0, len(corpus), step)]
+        parts = Parallel(n_jobs=-1)(delayed(self._hasher.transform)(chunk) for chunk in chunks)
+        return sparse.vstack(parts, format="csr")
+
     def _build_model(self, messages):
-        corpus = []
-        docs = []
-        for msg in messages:
-            member_name = str(msg.get("user_name", ""))
-            content = str(msg.get("message", ""))
-            if not content.strip():
-                continue
-            joined = f"{member_name} {content}".strip()
-            corpus.append(joined)
-            docs.append(msg)
-        vectorizer = TfidfVectorizer(stop_words="english", max_features=50000, ngram_range=(1, 2))
-        matrix = vectorizer.fit_transform(corpus) if corpus else None
-        self._vectorizer = vectorizer
+        docs = [msg for msg in messages if str(msg.get("message", "")).strip()]
+        corpus = [
+            f"{str(msg.get('user_name', ''))} {str(msg.get('message', ''))}".strip()
+            for msg in docs
+        ]
+        transformer = TfidfTransformer(norm="l2")
+        matrix = transformer.fit_transform(self._hash_corpus(corpus)) if docs else None
+        matrix_t = None
+        if matrix is not None:
+            # float32 halves the bytes the per-query dot product has to stream,
+            # and sorted indices give scipy's SpMV its fast row traversal.
+            matrix = matrix.astype(np.float32)
+            matrix.sort_indices()
+            # Pre-transpose once here so each query is a plain CSR product
+            # instead of materializing matrix.T per call.
+            matrix_t = matrix.T.tocsr()
+        self._transformer = transformer
         self._matrix = matrix
+        self._matrix_T = matrix_t
         self._docs = docs
+        # one-time O(N) lowering here instead of O(N) str.lower() per question
+        # inside the member/location filters
+        self._docs_lower = [text.lower() for text in corpus]
+        # run the qa extraction regexes once per document instead of once per
+        # question x top-k; answer_question reads doc["_entities"] directly
+        for doc, text in zip(docs, corpus):
+            if "_entities" not in doc:
+                doc["_entities"] = extract_entities(text)
+        # cached vectors belong to the old vocabulary
+        self._q_vec_cache = {}
 
     async def refresh(self):
         # Load whatever data we already have before fetching to avoid empty responses
@@ -91,25 +175,54 @@ class MessagesRetriever:
             self._build_model(messages)
 
         self._last_refresh = time.time()
+        self.generation += 1
         # print("Retriever cache refreshed!")
 
     async def retrieve(self, question, top_k=5):
         if self._should_refresh():
-            await self.refresh()
-        if not question or self._matrix is None or self._vectorizer is None or self._matrix.shape[0] == 0:
+            async with self._refresh_lock:
+                # double-checked: a concurrent asker may have refreshed while
+                # this coroutine waited on the lock
+                if self._should_refresh():
+                    await self.refresh()
+        elif self._near_expiry():
+            # still fresh enough to serve, so refit off the critical path
+            self._kick_background_refresh()
+        if not question or self._matrix is None or self._transformer is None or self._matrix.shape[0] == 0:
             return []
         # print(f"Looking up answers for: {question}")
-        q_vec = self._vectorizer.transform([question])
-        scores = cosine_similarity(q_vec, self._matrix)[0]
-        ranked = sorted(enumerate(scores), key=lambda x: x[1], reverse=True)[:top_k]
+        q_vec = self._q_vec_cache.get(question)
+        if q_vec is None:
+            q_vec = self._transformer.transform(self._hasher.transform([question])).astype(np.float32)
+            if len(self._q_vec_cache) >= 1024:
+                self._q_vec_cache.clear()
+            self._q_vec_cache[question] = q_vec
+        # The TfidfTransformer leaves rows L2-normalized (norm='l2'), so cosine
+        # similarity reduces to this sparse dot against the cached transpose.
+        scores = (q_vec @ self._matrix_T).toarray().ravel()
+        # O(N) partial selection of the top k, then sort just those k indices;
+        # avoids a full Python-level sort over every document score.
+        k = min(top_k, scores.shape[0])
+        top_idx = np.argpartition(-scores, k - 1)[:k]
+        top_idx = top_idx[np.argsort(-scores[top_idx])]
         results = []
-        for idx, score in ranked:
+        for idx in top_idx:
+            score = scores[idx]
             doc = self._docs[idx]
-            text = " ".join(
-                str(x) for x in [doc.get("user_name", ""), doc.get("message", "")] if x
-            )
+            # two dict lookups and an f-string beat spinning up a generator,
+            # a filter and str() calls for every result
+            name = doc.get("user_name") or ""
+            msg = doc.get("message") or ""
+            text = f"{name} {msg}" if name and msg else name or msg
             # print(f"Candidate: {text} (score={score:.3f})")
-            results.append(RetrievedMessage(text=text, score=float(score), meta=doc))
+            results.append(
+                RetrievedMessage(
+                    text=text,
+                    score=float(score),
+                    meta=doc,
+                    text_lower=self._docs_lower[idx],
+                )
+            )
         return results
 
 
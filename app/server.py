@@ -9,9 +9,21 @@ from .qa import answer_question
 
 retriever = MessagesRetriever()
 
+# Chat UI template, read once at startup; root() serves it from memory
+# instead of hitting the disk on every GET.
+_INDEX_HTML = ""
+
+# (retriever generation, question) -> answer; repeat questions skip the whole
+# retrieve + answer_question pipeline. Keyed on generation so a refresh
+# naturally invalidates every answer built from the previous model.
+_ANSWER_CACHE = {}
+_ANSWER_CACHE_MAX = 2048
+
 # Setup app lifespan (like FastAPI startup)
 @asynccontextmanager
 async def lifespan(app):
+    global _INDEX_HTML
+    _INDEX_HTML = (Path(__file__).parent / "templates" / "index.html").read_text(encoding="utf-8")
     try:
         # preload the retriever
         await retriever.refresh()
@@ -27,11 +39,8 @@ app = FastAPI(title="Aurora Member QA", version="0.1.0", lifespan=lifespan)
 
 @app.get("/", response_class=HTMLResponse)
 async def root():
-    # Serve the main HTML chat UI
-    html_path = Path(__file__).parent / "templates" / "index.html"
-    with open(html_path, "r", encoding="utf-8") as f:
-        # print("Loaded UI template")
-        return f.read()
+    # Serve the main HTML chat UI straight from memory
+    return HTMLResponse(_INDEX_HTML, headers={"Cache-Control": "public, max-age=300"})
 
 @app.get("/health")
 async def health():
@@ -44,9 +53,17 @@ async def ask(question = Query(..., description="Natural language question")):
     if not question or not question.strip():
         raise HTTPException(status_code=400, detail="Question must not be empty")
     # print(f"Question asked: {question}")
-    results = await retriever.retrieve(question, top_k=6)
-    # print(f"Top candidates: {[x.text for x in results]}")
-    answer = answer_question(question, results)
+    key = (retriever.generation, question)
+    answer = _ANSWER_CACHE.get(key)
+    if answer is None:
+        results = await retriever.retrieve(question, top_k=6)
+        # print(f"Top candidates: {[x.text for x in results]}")
+        answer = answer_question(question, results)
+        # retrieve() may have refreshed, so re-key against the model that
+        # actually answered; crude clear-all eviction like the query-vector cache
+        if len(_ANSWER_CACHE) >= _ANSWER_CACHE_MAX:
+            _ANSWER_CACHE.clear()
+        _ANSWER_CACHE[(retriever.generation, question)] = answer
     # print(f"Answer produced: {answer}")
     return {"answer": answer}
 